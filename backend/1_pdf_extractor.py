@@ -1,19 +1,50 @@
+import mmap
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
 import pdfplumber
+import pymupdf
+
+@contextmanager
+def _open_mmapped(pdf_path, pages=None):
+    # Serve pdfminer's seek/read calls from a read-only memory map backed by the OS page cache
+    with open(pdf_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with pdfplumber.open(mm, pages=pages) as pdf:
+            yield pdf
+
+def _extract_one(args):
+    # Each worker reopens the PDF and parses only its own page
+    pdf_path, page_number = args
+    with _open_mmapped(pdf_path, pages=[page_number]) as pdf:
+        page = pdf.pages[0]
+        # Scanned/image-only pages have no text layer, skip them
+        if not page.chars:
+            return ""
+        return page.extract_text() or ""
 
 def extract_text_pdfplumber(pdf_path):
-    full_text = []
+    with _open_mmapped(pdf_path) as pdf:
+        page_count = len(pdf.pages)
+
+    # Pages are parsed in parallel processes (pdfminer is pure Python, so threads would hit the GIL)
+    with ProcessPoolExecutor() as executor:
+        texts = executor.map(_extract_one, [(pdf_path, p) for p in range(1, page_count + 1)])
+        full_text = [text for text in texts if text]
+
+    return "\n".join(full_text)
 
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text()
-            if text:
-                full_text.append(text)
+def extract_text_pymupdf(pdf_path):
+    # Native MuPDF text extraction, much faster than pdfminer-based pdfplumber.
+    # extract_text_pdfplumber remains available for pages that need its layout handling.
+    with pymupdf.open(pdf_path) as doc:
+        full_text = [text for text in (page.get_text() for page in doc) if text]
 
     return "\n".join(full_text)
 
-text = extract_text_pdfplumber("Raw Data/BS-DS_ Jan 2026 Grading document (STUDENT).pdf")
-output_file = "Cleaned Data/extracted_text.txt"
-with open(output_file, "w", encoding="utf-8") as f:
-    f.write(text)
+if __name__ == "__main__":
+    text = extract_text_pymupdf("Raw Data/BS-DS_ Jan 2026 Grading document (STUDENT).pdf")
+    output_file = "Cleaned Data/extracted_text.txt"
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(text)
 
-print(text[:1000])
\ No newline at end of file
+    print(text[:1000])
@@ -1,6 +1,8 @@
-import json
+import bisect
+import hashlib
 import os
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+import orjson
 
 # ---------------- CONFIG ----------------
 INPUT_FILE = "Cleaned Data/single_corpus.txt"
@@ -9,46 +11,98 @@ OUTPUT_FILE = "Cleaned Data/chunks.json"
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
 SOURCE_NAME = os.path.basename(INPUT_FILE)
+
+# Break points in priority order (lower index = preferred); characters are the last resort
+SEPARATORS = [
+    "\n\n",  # Double newline (paragraphs)
+    "\n",    # Single newline
+    ". ",    # Sentence end with space (highest priority for sentences)
+    "! ",    # Exclamation with space
+    "? ",    # Question mark with space
+    " ",     # Space (word boundary)
+]
 # --------------------------------------
 
 
-def langchain_chunking(text):
+def split_text(text):
     """
-    Chunk text using LangChain's RecursiveCharacterTextSplitter.
-    This splitter recursively tries different separators to avoid breaking sentences.
-    Priority is given to sentence boundaries to ensure no sentence is broken.
+    Split text into chunks of at most CHUNK_SIZE characters with ~CHUNK_OVERLAP overlap.
+    Break candidates for every separator are collected in one pass over the text,
+    then chunks are greedily packed, ending at the highest-priority break in each window
+    so that sentences are kept whole wherever possible.
+    Separators stay with the preceding chunk.
     """
-    # Initialize the text splitter with separators prioritizing sentence boundaries
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        length_function=len,
-        is_separator_regex=False,
-        keep_separator=True,  # Keep separators with the preceding chunk
-        separators=[
-            "\n\n",  # Double newline (paragraphs)
-            "\n",    # Single newline
-            ". ",    # Sentence end with space (highest priority for sentences)
-            "! ",    # Exclamation with space
-            "? ",    # Question mark with space
-            " ",     # Space (word boundary)
-            ""       # Character (last resort)
-        ]
-    )
+    # Collect (offset, priority) break candidates; an offset is where the next chunk may start
+    best_priority = {}
+    for priority, sep in enumerate(SEPARATORS):
+        i = 0
+        while (j := text.find(sep, i)) != -1:
+            offset = j + len(sep)
+            if offset not in best_priority:
+                best_priority[offset] = priority
+            i = j + 1
+    offsets = sorted(best_priority)
+    priorities = [best_priority[offset] for offset in offsets]
     
+    text_chunks = []
+    cursor = 0
+    length = len(text)
+    while cursor < length:
+        limit = cursor + CHUNK_SIZE
+        if limit >= length:
+            end = length
+        else:
+            # Best break in (cursor + CHUNK_OVERLAP, limit]: highest priority, then furthest
+            lo = bisect.bisect_right(offsets, cursor + CHUNK_OVERLAP)
+            hi = bisect.bisect_right(offsets, limit)
+            end = limit  # Character split if no separator fits
+            best = len(SEPARATORS)
+            for k in range(hi - 1, lo - 1, -1):
+                if priorities[k] < best:
+                    best = priorities[k]
+                    end = offsets[k]
+                    if best == 0:
+                        break
+        
+        text_chunks.append(text[cursor:end])
+        if end >= length:
+            break
+        
+        # Start the next chunk up to CHUNK_OVERLAP characters back, on the first break in that span
+        k = bisect.bisect_left(offsets, end - CHUNK_OVERLAP)
+        next_cursor = offsets[k] if k < len(offsets) and offsets[k] < end else end
+        cursor = max(next_cursor, cursor + 1)
+    
+    return text_chunks
+
+
+def chunk_text(text):
+    """
+    Chunk text and format the chunks with ids and metadata.
+    """
     # Split the text
-    text_chunks = text_splitter.split_text(text)
+    text_chunks = split_text(text)
     
-    # Format chunks into the desired structure
+    # Format chunks into the desired structure (whitespace-only slices are dropped)
     chunks = []
-    for idx, chunk_text in enumerate(text_chunks, start=1):
+    for raw in text_chunks:
+        stripped = raw.strip()
+        if not stripped:
+            continue
+        idx = len(chunks) + 1
+        chunk_size = len(stripped)
         chunks.append({
             "chunk_id": idx,
-            "text": chunk_text.strip(),
+            "text": stripped,
             "source": SOURCE_NAME,
-            "chunk_size": len(chunk_text.strip())
+            "chunk_size": chunk_size,
+            # Lets the embedder skip chunks whose content is already stored
+            "content_hash": hashlib.blake2b(stripped.encode('utf-8'), digest_size=16).hexdigest()
         })
-        print(f"✅ Chunk {idx}: Stored successfully ({len(chunk_text.strip())} chars)")
+        # Report progress in batches rather than flushing stdout per chunk
+        if idx % 100 == 0:
+            print(f"✅ Chunks stored: {idx}")
+    print(f"✅ Chunks stored: {len(chunks)}")
     
     return chunks
 
@@ -65,12 +119,12 @@ if __name__ == "__main__":
     print(f"🔄 Overlap size: {CHUNK_OVERLAP} characters")
     print("-" * 60)
     
-    # Perform chunking using LangChain
-    chunks = langchain_chunking(text)
+    # Perform chunking
+    chunks = chunk_text(text)
     
     # Save to JSON
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(chunks, f, ensure_ascii=False, indent=2)
+    with open(OUTPUT_FILE, "wb") as f:
+        f.write(orjson.dumps(chunks, option=orjson.OPT_INDENT_2))
     
     print("-" * 60)
     print("✅ Chunking complete!")
@@ -1,9 +1,13 @@
-import json
+import asyncio
+import functools
+import hashlib
 import os
 import chromadb
 from chromadb.config import Settings
 from chromadb.utils import embedding_functions
-import ollama
+import httpx
+import ijson
+import orjson
 
 # ---------------- CONFIG ----------------
 # Get the directory where the script is located
@@ -12,8 +16,43 @@ INPUT_FILE = os.path.join(BASE_DIR, "Cleaned Data", "chunks.json")
 CHROMA_DB_PATH = os.path.join(BASE_DIR, "chroma_db")
 COLLECTION_NAME = "bs_rag_collection"
 EMBEDDING_MODEL = "nomic-embed-text"  # Standard embedding model, change if using custom
+# Max embedding requests in flight against Ollama. The server only processes
+# OLLAMA_NUM_PARALLEL of them at once, so start it with a matching value
+# (e.g. OLLAMA_NUM_PARALLEL=16 ollama serve) to keep it saturated.
+EMBEDDING_CONCURRENCY = 16
+# Same OLLAMA_HOST variable the ollama client (used for generation) reads
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+if "://" not in OLLAMA_HOST:
+    OLLAMA_HOST = f"http://{OLLAMA_HOST}"
+OLLAMA_EMBEDDINGS_URL = f"{OLLAMA_HOST.rstrip('/')}/api/embeddings"
+BATCH_SIZE = 200  # Chunks per ChromaDB insert (keeps each SQLite transaction bounded)
+QUEUE_SIZE = 64  # Max parsed chunks waiting for an embedding request
+# Embed in-process with sentence-transformers (GPU if available) instead of Ollama.
+# Shared with 5_retriever.py, which embeds queries with the same backend.
+USE_LOCAL = False
+EMBEDDING_MODEL_HF = "nomic-ai/nomic-embed-text-v1.5"  # Same model as EMBEDDING_MODEL, Hugging Face weights
+LOCAL_BATCH_SIZE = 64
 # --------------------------------------
 
+# Pooled, keep-alive connections to Ollama instead of a fresh connection per request
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=40, max_connections=100, keepalive_expiry=30)
+HTTP_TIMEOUT = httpx.Timeout(300, connect=10)
+_session = httpx.Client(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+
+
+def content_hash(text):
+    """
+    Stable hash of a chunk's text, used for deduplication and change detection.
+    """
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def chunk_hash(chunk):
+    """
+    Content hash for a chunk, computed if the chunk file predates stored hashes.
+    """
+    return chunk.get('content_hash') or content_hash(chunk['text'])
+
 
 def load_chunks(file_path):
     """
@@ -21,16 +60,27 @@ def load_chunks(file_path):
     """
     print(f"[INFO] Loading chunks from: {file_path}")
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        chunks = json.load(f)
+    with open(file_path, 'rb') as f:
+        chunks = orjson.loads(f.read())
     
     print(f"[SUCCESS] Loaded {len(chunks)} chunks")
     return chunks
 
 
+def iter_chunks(file_path):
+    """
+    Stream chunks from the JSON file one at a time instead of loading the whole list.
+    """
+    print(f"[INFO] Streaming chunks from: {file_path}")
+    
+    with open(file_path, 'rb') as f:
+        yield from ijson.items(f, 'item')
+
+
 def initialize_chromadb(db_path, collection_name):
     """
-    Initialize ChromaDB client and create/get collection.
+    Initialize ChromaDB client and get the collection, creating it if needed.
+    The existing collection is kept so re-ingest only touches changed chunks.
     """
     print(f"[INFO] Initializing ChromaDB at: {db_path}")
     
@@ -44,21 +94,13 @@ def initialize_chromadb(db_path, collection_name):
         settings=Settings(anonymized_telemetry=False)
     )
     
-    # Try to get existing collection or create new one
+    # Get existing collection or create new one
     try:
-        # Delete existing collection if it exists (for fresh start)
-        try:
-            client.delete_collection(name=collection_name)
-            print(f"[INFO] Deleted existing collection: {collection_name}")
-        except:
-            pass
-        
-        # Create new collection
-        collection = client.create_collection(
+        collection = client.get_or_create_collection(
             name=collection_name,
             metadata={"description": "BS RAG embeddings collection"}
         )
-        print(f"[SUCCESS] Created new collection: {collection_name}")
+        print(f"[SUCCESS] Using collection: {collection_name} ({collection.count()} existing documents)")
         
     except Exception as e:
         print(f"[ERROR] Failed to create collection: {e}")
@@ -67,64 +109,330 @@ def initialize_chromadb(db_path, collection_name):
     return client, collection
 
 
-def generate_embeddings_with_ollama(texts, model_name):
+def dedupe_texts(texts):
     """
-    Generate embeddings for a list of texts using Ollama.
+    Collapse identical texts so each distinct one is embedded once.
+    
+    Returns:
+        tuple: (unique texts, index into the unique list for every input text)
     """
-    print(f"[INFO] Generating embeddings using Ollama model: {model_name}")
+    seen = {}
+    unique_texts = []
+    positions = []
+    for text in texts:
+        text_hash = content_hash(text)
+        if text_hash not in seen:
+            seen[text_hash] = len(unique_texts)
+            unique_texts.append(text)
+        positions.append(seen[text_hash])
     
-    embeddings = []
-    total = len(texts)
+    if len(unique_texts) < len(texts):
+        print(f"[INFO] Skipping {len(texts) - len(unique_texts)} duplicate chunks")
     
-    for idx, text in enumerate(texts, 1):
-        try:
-            # Generate embedding using Ollama
-            response = ollama.embeddings(
-                model=model_name,
-                prompt=text
-            )
-            
-            embedding = response['embedding']
-            embeddings.append(embedding)
-            
-            # Progress indicator
-            if idx % 10 == 0 or idx == total:
-                print(f"[PROGRESS] Generated embeddings: {idx}/{total}")
-                
-        except Exception as e:
-            print(f"[ERROR] Failed to generate embedding for chunk {idx}: {e}")
-            raise
+    return unique_texts, positions
+
+
+def active_embedding_model():
+    """
+    Name of the model the current configuration embeds with (recorded in chunk metadata).
+    """
+    return EMBEDDING_MODEL_HF if USE_LOCAL else EMBEDDING_MODEL
+
+
+@functools.lru_cache(maxsize=None)
+def load_local_model(model_name):
+    """
+    Load a sentence-transformers model once per process.
+    Requires the optional sentence-transformers package.
+    """
+    from sentence_transformers import SentenceTransformer
+    
+    return SentenceTransformer(model_name, trust_remote_code=True)
+
+
+def embed_query(text):
+    """
+    Embed a single query with the configured backend (USE_LOCAL or Ollama),
+    so queries land in the same vector space as the stored chunks.
+    """
+    if USE_LOCAL:
+        model = load_local_model(EMBEDDING_MODEL_HF)
+        return model.encode([text], convert_to_numpy=True, normalize_embeddings=True)[0].tolist()
+    
+    response = _session.post(
+        OLLAMA_EMBEDDINGS_URL,
+        json={"model": EMBEDDING_MODEL, "prompt": text}
+    )
+    response.raise_for_status()
+    return response.json()['embedding']
+
+
+def generate_embeddings_local(texts, model_name):
+    """
+    Generate embeddings for a list of texts in-process with sentence-transformers.
+    Texts are encoded in batches of LOCAL_BATCH_SIZE on the GPU when one is available.
+    Identical texts are embedded only once.
+    Requires the optional sentence-transformers package.
+    """
+    print(f"[INFO] Generating embeddings locally using model: {model_name}")
+    
+    unique_texts, positions = dedupe_texts(texts)
+    
+    model = load_local_model(model_name)
+    unique_embeddings = model.encode(
+        unique_texts,
+        batch_size=LOCAL_BATCH_SIZE,
+        show_progress_bar=True,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    ).tolist()
+    
+    # Fan the unique vectors back out to every original position
+    embeddings = [unique_embeddings[position] for position in positions]
     
     print(f"[SUCCESS] Generated {len(embeddings)} embeddings")
     return embeddings
 
 
-def store_embeddings_in_chromadb(collection, chunks, embeddings):
+def chunk_doc_id(chunk):
+    """
+    ChromaDB id for a chunk, keyed on its content so ids survive renumbering.
+    """
+    return f"chunk_{chunk_hash(chunk)}"
+
+
+def chunk_metadata(chunk, model_name):
+    """
+    Metadata stored alongside a chunk's embedding.
+    """
+    return {
+        "chunk_id": chunk['chunk_id'],
+        "source": chunk['source'],
+        "chunk_size": chunk['chunk_size'],
+        "content_hash": chunk_hash(chunk),
+        "embedding_model": model_name
+    }
+
+
+def get_existing_metadata(collection):
+    """
+    Map each stored chunk id to its metadata.
+    """
+    existing = collection.get(include=["metadatas"])
+    return {
+        doc_id: metadata or {}
+        for doc_id, metadata in zip(existing['ids'], existing['metadatas'])
+    }
+
+
+def is_up_to_date(chunk, existing, model_name):
+    """
+    True if this chunk's text is already stored with an embedding from model_name.
+    """
+    stored = existing.get(chunk_doc_id(chunk))
+    return stored is not None and stored.get("embedding_model") == model_name
+
+
+def update_chunk_metadata(collection, chunks, model_name):
+    """
+    Refresh metadata (e.g. chunk_id after renumbering) without re-embedding.
+    """
+    for i in range(0, len(chunks), BATCH_SIZE):
+        batch = chunks[i:i + BATCH_SIZE]
+        collection.update(
+            ids=[chunk_doc_id(chunk) for chunk in batch],
+            metadatas=[chunk_metadata(chunk, model_name) for chunk in batch]
+        )
+
+
+def delete_stale_chunks(collection, existing_ids, current_ids):
+    """
+    Delete stored chunks whose ids are no longer produced by chunking.
+    """
+    stale = [doc_id for doc_id in existing_ids if doc_id not in current_ids]
+    for i in range(0, len(stale), BATCH_SIZE):
+        collection.delete(ids=stale[i:i + BATCH_SIZE])
+    if stale:
+        print(f"[INFO] Deleted {len(stale)} stale chunks")
+
+
+def embed_and_store_streaming(chunk_iter, collection, model_name):
+    """
+    Embed chunks as they are parsed and store them in ChromaDB in batches.
+    A producer feeds a bounded queue that EMBEDDING_CONCURRENCY consumers drain,
+    so embedding starts with the first chunk and memory is bounded by QUEUE_SIZE
+    parsed chunks plus one BATCH_SIZE batch of results, independent of corpus size.
+    Each ChromaDB insert overlaps with embedding of the following batch.
+    Ids are content hashes, so identical texts are embedded once per run and
+    chunks already stored with an embedding from model_name are skipped entirely.
+    
+    Returns:
+        int: Number of chunks stored
+    """
+    print(f"[INFO] Streaming embeddings using Ollama model: {model_name}")
+    
+    existing = get_existing_metadata(collection)
+    current_ids = set()
+    unchanged = 0
+    
+    async def _run():
+        client = httpx.AsyncClient(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        pending = []
+        renumbered = []
+        stored = 0
+        
+        async def embed(text):
+            response = await client.post(
+                OLLAMA_EMBEDDINGS_URL,
+                json={"model": model_name, "prompt": text}
+            )
+            response.raise_for_status()
+            return response.json()['embedding']
+        
+        add_lock = asyncio.Lock()
+        add_task = None
+        
+        async def store(batch_chunks, batch_embeddings):
+            nonlocal stored
+            # The ChromaDB insert runs in a worker thread so embedding requests keep flowing
+            await asyncio.to_thread(
+                store_embeddings_in_chromadb, collection, batch_chunks, batch_embeddings, model_name
+            )
+            stored += len(batch_chunks)
+            print(f"[PROGRESS] Stored embeddings: {stored}")
+        
+        async def flush():
+            nonlocal add_task
+            batch_chunks = [chunk for chunk, _ in pending]
+            batch_embeddings = [embedding for _, embedding in pending]
+            pending.clear()
+            # Keep at most one insert in flight: wait for the previous one before starting the next
+            async with add_lock:
+                if add_task is not None:
+                    await add_task
+                add_task = asyncio.create_task(store(batch_chunks, batch_embeddings))
+        
+        async def flush_renumbered():
+            batch = renumbered[:]
+            renumbered.clear()
+            await asyncio.to_thread(update_chunk_metadata, collection, batch, model_name)
+        
+        async def producer():
+            for chunk in chunk_iter:
+                await queue.put(chunk)
+            for _ in range(EMBEDDING_CONCURRENCY):
+                await queue.put(None)
+        
+        async def consumer():
+            nonlocal unchanged
+            while (chunk := await queue.get()) is not None:
+                doc_id = chunk_doc_id(chunk)
+                # A repeat of text already seen this run maps to the same id
+                if doc_id in current_ids:
+                    continue
+                current_ids.add(doc_id)
+                
+                if is_up_to_date(chunk, existing, model_name):
+                    unchanged += 1
+                    # Text moved position: update its metadata, keep the stored vector
+                    if existing[doc_id].get("chunk_id") != chunk['chunk_id']:
+                        renumbered.append(chunk)
+                        if len(renumbered) >= BATCH_SIZE:
+                            await flush_renumbered()
+                    continue
+                
+                try:
+                    embedding = await embed(chunk['text'])
+                except Exception as e:
+                    print(f"[ERROR] Failed to generate embedding for chunk {chunk['chunk_id']}: {e}")
+                    raise
+                pending.append((chunk, embedding))
+                if len(pending) >= BATCH_SIZE:
+                    await flush()
+        
+        async with client:
+            await asyncio.gather(producer(), *[consumer() for _ in range(EMBEDDING_CONCURRENCY)])
+        if pending:
+            await flush()
+        if renumbered:
+            await flush_renumbered()
+        if add_task is not None:
+            await add_task
+        return stored
+    
+    stored = asyncio.run(_run())
+    delete_stale_chunks(collection, existing, current_ids)
+    
+    print(f"[SUCCESS] Embedded and stored {stored} chunks ({unchanged} unchanged)")
+    return stored
+
+
+def embed_and_store(chunks, collection):
+    """
+    Embed chunks with the configured backend and store them in ChromaDB.
+    USE_LOCAL selects in-process sentence-transformers; otherwise chunks are
+    streamed through Ollama. Only chunks that are new, changed, or embedded by
+    a different model are embedded.
+    
+    Args:
+        chunks: Iterable of chunk dictionaries
+        collection: ChromaDB collection to store into
+    
+    Returns:
+        int: Number of chunks stored
+    """
+    if not USE_LOCAL:
+        return embed_and_store_streaming(iter(chunks), collection, EMBEDDING_MODEL)
+    
+    # Keep the first occurrence of each text; repeats share its content-hash id
+    unique_chunks = {}
+    for chunk in chunks:
+        unique_chunks.setdefault(chunk_doc_id(chunk), chunk)
+    
+    existing = get_existing_metadata(collection)
+    delete_stale_chunks(collection, existing, unique_chunks)
+    
+    to_embed = []
+    renumbered = []
+    for doc_id, chunk in unique_chunks.items():
+        if not is_up_to_date(chunk, existing, EMBEDDING_MODEL_HF):
+            to_embed.append(chunk)
+        elif existing[doc_id].get("chunk_id") != chunk['chunk_id']:
+            renumbered.append(chunk)
+    update_chunk_metadata(collection, renumbered, EMBEDDING_MODEL_HF)
+    
+    if to_embed:
+        texts = [chunk['text'] for chunk in to_embed]
+        embeddings = generate_embeddings_local(texts, EMBEDDING_MODEL_HF)
+        store_embeddings_in_chromadb(collection, to_embed, embeddings, EMBEDDING_MODEL_HF)
+    
+    print(f"[SUCCESS] Embedded and stored {len(to_embed)} chunks ({len(unique_chunks) - len(to_embed)} unchanged)")
+    return len(to_embed)
+
+
+def store_embeddings_in_chromadb(collection, chunks, embeddings, model_name):
     """
     Store chunks and their embeddings in ChromaDB.
+    Chunks are upserted, so existing ids are overwritten in place.
+    The model name is recorded so a model change triggers re-embedding.
     """
     print(f"[INFO] Storing embeddings in ChromaDB collection")
     
     # Prepare data for ChromaDB
-    ids = [f"chunk_{chunk['chunk_id']}" for chunk in chunks]
+    ids = [chunk_doc_id(chunk) for chunk in chunks]
     documents = [chunk['text'] for chunk in chunks]
-    metadatas = [
-        {
-            "chunk_id": chunk['chunk_id'],
-            "source": chunk['source'],
-            "chunk_size": chunk['chunk_size']
-        }
-        for chunk in chunks
-    ]
-    
-    # Add to collection
+    metadatas = [chunk_metadata(chunk, model_name) for chunk in chunks]
+    
+    # Upsert into collection in batches
     try:
-        collection.add(
-            ids=ids,
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas
-        )
+        for i in range(0, len(ids), BATCH_SIZE):
+            collection.upsert(
+                ids=ids[i:i + BATCH_SIZE],
+                embeddings=embeddings[i:i + BATCH_SIZE],
+                documents=documents[i:i + BATCH_SIZE],
+                metadatas=metadatas[i:i + BATCH_SIZE]
+            )
         print(f"[SUCCESS] Stored {len(chunks)} chunks with embeddings in ChromaDB")
         
     except Exception as e:
@@ -153,17 +461,13 @@ def verify_storage(collection):
 
 def test_query(collection, query_text, n_results=3):
     """
-    Test querying the ChromaDB collection with Ollama embeddings.
+    Test querying the ChromaDB collection, embedding the query with the configured backend.
     """
     print(f"\n[INFO] Testing query functionality")
     print(f"[INFO] Query: '{query_text}'")
     
-    # Generate embedding for query using Ollama
-    query_response = ollama.embeddings(
-        model=EMBEDDING_MODEL,
-        prompt=query_text
-    )
-    query_embedding = query_response['embedding']
+    # Generate embedding for query with the same model as the stored chunks
+    query_embedding = embed_query(query_text)
     
     # Query the collection
     results = collection.query(
@@ -191,23 +495,18 @@ def main():
     print("="*70 + "\n")
     
     try:
-        # Step 1: Load chunks
-        chunks = load_chunks(INPUT_FILE)
-        
-        # Step 2: Initialize ChromaDB
-        client, collection = initialize_chromadb(CHROMA_DB_PATH, COLLECTION_NAME)
-        
-        # Step 3: Generate embeddings using Ollama
-        texts = [chunk['text'] for chunk in chunks]
-        embeddings = generate_embeddings_with_ollama(texts, EMBEDDING_MODEL)
+        # Step 1: Initialize ChromaDB
+        _, collection = initialize_chromadb(CHROMA_DB_PATH, COLLECTION_NAME)
         
-        # Step 4: Store embeddings in ChromaDB
-        store_embeddings_in_chromadb(collection, chunks, embeddings)
+        # Step 2: Generate embeddings and store them in ChromaDB
+        # (the local path encodes the whole list at once, Ollama streams from the file)
+        chunks = load_chunks(INPUT_FILE) if USE_LOCAL else iter_chunks(INPUT_FILE)
+        embed_and_store(chunks, collection)
         
-        # Step 5: Verify storage
+        # Step 3: Verify storage
         verify_storage(collection)
         
-        # Step 6: Test query
+        # Step 4: Test query
         test_query(
             collection,
             query_text="When is quiz 1 scheduled?",
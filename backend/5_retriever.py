@@ -1,29 +1,204 @@
+import asyncio
+import functools
 import chromadb
 from chromadb.config import Settings
-import ollama
+import httpx
+import numpy as np
 import os
+import sys
+
+# Add parent directory to path to import the embedding module
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Query embedding settings (USE_LOCAL, model names, Ollama endpoint) are shared with ingest
+embedding = __import__("4_embedding")
+
+try:
+    import faiss
+except ImportError:  # Fall back to the NumPy int8 search below
+    faiss = None
+
+try:
+    from numba import njit, prange
+except ImportError:  # Score the int8 fallback with plain NumPy
+    njit = None
 
 # ---------------- CONFIG ----------------
 # Get the directory where the script is located
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CHROMA_DB_PATH = os.path.join(BASE_DIR, "chroma_db")
 COLLECTION_NAME = "bs_rag_collection"
-EMBEDDING_MODEL = "nomic-embed-text"  # Ollama embedding model (alternatively: mxbai-embed-large)
 TOP_K = 5
+EMBEDDING_CONCURRENCY = 16  # Max embedding requests in flight for multi-query batches
+# Search uses an exact FAISS index when faiss is installed (the default install).
+# Without it, embeddings are held as int8 and scored by a Numba kernel if the
+# optional numba package is installed, or block-wise with NumPy otherwise.
+SCORE_BLOCK_ROWS = 4096  # Rows widened to float32 at a time when scoring int8 embeddings
 # --------------------------------------
 
+# Connect to ChromaDB (persistent) once and reuse the collection across queries
+_client = chromadb.PersistentClient(
+    path=CHROMA_DB_PATH,
+    settings=Settings(anonymized_telemetry=False)
+)
+_collection = _client.get_collection(name=COLLECTION_NAME)
+
+
+def normalize_rows(vectors):
+    """
+    Scale vectors to unit length along the last axis.
+    Zero vectors are left as zeros instead of turning into NaNs.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, np.finfo(np.float32).eps)
+
+
+def quantize_int8(vectors):
+    """
+    Scalar-quantize float vectors to int8 with one scale per vector (SQ8).
+    Works on a single vector or a 2D matrix of row vectors.
+    
+    Returns:
+        tuple: (int8 array, float32 scales) such that vectors ~= q * scales
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=-1, keepdims=True) / 127
+    scales[scales == 0] = 1.0
+    quantized = np.round(vectors / scales).astype(np.int8)
+    return quantized, np.squeeze(scales, axis=-1).astype(np.float32)
+
+
+# Load all embeddings once and unit-normalize them. With FAISS they go into an exact
+# inner-product index; otherwise they are kept as int8 (4x smaller than float32).
+_data = _collection.get(include=["embeddings", "documents", "metadatas"])
+_documents = _data["documents"]
+_metadatas = _data["metadatas"]
+print(f"✅ ChromaDB loaded - Collection: {COLLECTION_NAME} ({len(_documents)} chunks)")
+
+# Queries must be embedded by the model that produced the stored vectors
+# (chunks stored before the model was recorded came from the Ollama model)
+_stored_models = {(metadata or {}).get("embedding_model", embedding.EMBEDDING_MODEL) for metadata in _metadatas}
+if _stored_models - {embedding.active_embedding_model()}:
+    raise RuntimeError(
+        f"Collection {COLLECTION_NAME} holds embeddings from {sorted(_stored_models)}, but queries "
+        f"are embedded with {embedding.active_embedding_model()}. Re-run 4_embedding.py with the "
+        f"current USE_LOCAL setting."
+    )
+_embeddings = _data["embeddings"]
+if _embeddings is None or len(_embeddings) == 0:
+    # Empty collection: nothing to index, retrieve_relevant_chunks returns no results
+    _index = None
+    _matrix_int8, _scales = np.empty((0, 0), dtype=np.int8), np.empty(0, dtype=np.float32)
+else:
+    _matrix = normalize_rows(_embeddings)
+    if faiss is not None:
+        _index = faiss.IndexFlatIP(_matrix.shape[1])
+        _index.add(_matrix)
+    else:
+        _index = None
+        _matrix_int8, _scales = quantize_int8(_matrix)
+    del _matrix
+del _data, _embeddings
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _int8_scores(matrix, query, scales, query_scale):
+        """
+        Dot every int8 row with the int8 query, accumulating in integers.
+        Rows are scored in parallel and no widened copy of the matrix is made.
+        """
+        n, d = matrix.shape
+        scores = np.empty(n, dtype=np.float32)
+        for i in prange(n):
+            acc = 0
+            for j in range(d):
+                acc += np.int32(matrix[i, j]) * np.int32(query[j])
+            scores[i] = acc * scales[i] * query_scale
+        return scores
+else:
+    def _int8_scores(matrix, query, scales, query_scale):
+        """
+        Dot every int8 row with the int8 query.
+        Rows are widened to float32 one block at a time so scoring runs on a BLAS
+        GEMV and the temporary copy stays at SCORE_BLOCK_ROWS rows.
+        """
+        query = query.astype(np.float32)
+        scores = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(matrix), SCORE_BLOCK_ROWS):
+            block = matrix[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            np.dot(block, query, out=scores[start:start + SCORE_BLOCK_ROWS])
+        return scores * scales * query_scale
+
+
+def _search_faiss(query_vector, top_k):
+    """
+    Exact cosine top-k using FAISS's SIMD inner-product kernels.
+    """
+    scores, rows = _index.search(query_vector[None, :], top_k)
+    return rows[0], scores[0]
+
+
+def _search_int8(query_vector, top_k):
+    """
+    Approximate cosine top-k over the int8 matrix (Numba-compiled scoring when available).
+    """
+    query_int8, query_scale = quantize_int8(query_vector)
+    scores = _int8_scores(_matrix_int8, query_int8, _scales, np.float32(query_scale))
+    
+    if top_k < len(scores):
+        top = np.argpartition(-scores, top_k)[:top_k]
+    else:
+        top = np.arange(len(scores))
+    top = top[np.argsort(-scores[top])]
+    return top, scores[top]
+
+
+@functools.lru_cache(maxsize=2048)
+def get_query_embedding(text):
+    """
+    Embed a query with the same backend as ingest (see 4_embedding.USE_LOCAL).
+    Results are memoized, so repeated queries skip the embedding round-trip.
+    Returned as a tuple so the cached value cannot be mutated by callers.
+    """
+    return tuple(embedding.embed_query(text))
 
-def get_ollama_embedding(text):
+
+def get_query_embeddings(texts):
     """
-    Generate embeddings using Ollama's embedding model.
+    Embed several queries at once with the same backend as ingest.
+    Ollama requests are issued concurrently over a pooled client; the local
+    model encodes them as one batch. Results are returned in input order.
     """
-    response = ollama.embeddings(model=EMBEDDING_MODEL, prompt=text)
-    return response["embedding"]
+    if embedding.USE_LOCAL:
+        model = embedding.load_local_model(embedding.EMBEDDING_MODEL_HF)
+        return model.encode(list(texts), convert_to_numpy=True, normalize_embeddings=True).tolist()
+
+    async def _embed_all(texts):
+        client = httpx.AsyncClient(http2=True, limits=embedding.HTTP_LIMITS, timeout=embedding.HTTP_TIMEOUT)
+        sem = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+
+        async def one(text):
+            async with sem:
+                response = await client.post(
+                    embedding.OLLAMA_EMBEDDINGS_URL,
+                    json={"model": embedding.EMBEDDING_MODEL, "prompt": text}
+                )
+                response.raise_for_status()
+                return response.json()["embedding"]
+
+        async with client:
+            return await asyncio.gather(*[one(text) for text in texts])
+
+    return asyncio.run(_embed_all(texts))
 
 
 def retrieve_relevant_chunks(query, top_k=TOP_K):
     """
-    Retrieve the most relevant chunks for a given query using ChromaDB.
+    Retrieve the most relevant chunks for a given query.
+    Embeddings are loaded from ChromaDB once and searched in memory
+    (FAISS when installed, NumPy otherwise).
     
     Args:
         query (str): The search query
@@ -32,36 +207,30 @@ def retrieve_relevant_chunks(query, top_k=TOP_K):
     Returns:
         list: List of dictionaries containing ranked chunks with metadata and scores
     """
-    # Connect to ChromaDB (persistent)
-    client = chromadb.PersistentClient(
-        path=CHROMA_DB_PATH,
-        settings=Settings(anonymized_telemetry=False)
-    )
-    
-    # Load collection
-    collection = client.get_collection(name=COLLECTION_NAME)
-    
-    print(f"✅ ChromaDB loaded - Collection: {COLLECTION_NAME}")
-    
     # Generate query embedding
     print("[INFO] Generating query embedding...")
-    query_embedding = get_ollama_embedding(query)
+    query_embedding = get_query_embedding(query)
     
-    # Perform similarity search
+    # Perform similarity search (cosine similarity, in memory)
     print(f"[INFO] Searching for top {top_k} relevant chunks...")
-    results = collection.query(
-        query_embeddings=[query_embedding],
-        n_results=top_k
-    )
+    top_k = min(top_k, len(_documents))
+    if top_k == 0:
+        return []
+    query_vector = normalize_rows(query_embedding)
+    
+    if _index is not None:
+        rows, scores = _search_faiss(query_vector, top_k)
+    else:
+        rows, scores = _search_int8(query_vector, top_k)
     
     # Format results with ranking scores
     ranked_chunks = []
-    for i in range(len(results["documents"][0])):
+    for rank, (row, score) in enumerate(zip(rows, scores), start=1):
         chunk_data = {
-            "rank": i + 1,
-            "score": results["distances"][0][i],  # Lower distance = higher similarity
-            "metadata": results["metadatas"][0][i],
-            "text": results["documents"][0][i]
+            "rank": rank,
+            "score": float(score),  # Cosine similarity, higher = more similar
+            "metadata": _metadatas[row],
+            "text": _documents[row]
         }
         ranked_chunks.append(chunk_data)
     
@@ -15,22 +15,15 @@ TOP_K = 5
 # --------------------------------------
 
 
-def generate_answer(query, retrieved_chunks):
+def build_prompt(query, retrieved_chunks):
     """
-    Generate an answer using Llama 3 based on retrieved context chunks.
-    
-    Args:
-        query (str): The user's question
-        retrieved_chunks (list): List of retrieved chunk dictionaries
-    
-    Returns:
-        str: Generated answer from Llama 3
+    Build the Llama 3 prompt from the query and retrieved context chunks.
     """
     # Combine retrieved chunks as context
     context = "\n\n".join([chunk["text"] for chunk in retrieved_chunks])
     
     # Create prompt for Llama 3
-    prompt = f"""Based on the following context, answer the user's question. If the answer is not in the context, say "I don't have enough information to answer this question."
+    return f"""Based on the following context, answer the user's question. If the answer is not in the context, say "I don't have enough information to answer this question."
 
 Context:
 {context}
@@ -38,15 +31,51 @@ Context:
 Question: {query}
 
 Answer:"""
+
+
+def stream_answer(query, retrieved_chunks):
+    """
+    Stream an answer from Llama 3 token by token.
+    
+    Args:
+        query (str): The user's question
+        retrieved_chunks (list): List of retrieved chunk dictionaries
+    
+    Yields:
+        str: Response fragments as Ollama decodes them
+    """
+    prompt = build_prompt(query, retrieved_chunks)
+    
+    for part in ollama.generate(model=GENERATION_MODEL, prompt=prompt, stream=True):
+        yield part["response"]
+
+
+def generate_answer(query, retrieved_chunks):
+    """
+    Generate an answer using Llama 3 based on retrieved context chunks.
+    Tokens are written to stdout as soon as they arrive.
+    
+    Args:
+        query (str): The user's question
+        retrieved_chunks (list): List of retrieved chunk dictionaries
     
+    Returns:
+        str: Generated answer from Llama 3
+    """
     # Generate response using Ollama Llama 3
     print("\n🤖 Generating answer using Llama 3...\n")
-    response = ollama.generate(
-        model=GENERATION_MODEL,
-        prompt=prompt
-    )
+    print("="*80)
+    print("💡 GENERATED ANSWER")
+    print("="*80)
     
-    return response["response"]
+    parts = []
+    for token in stream_answer(query, retrieved_chunks):
+        sys.stdout.write(token)
+        sys.stdout.flush()
+        parts.append(token)
+    print()
+    
+    return "".join(parts)
 
 
 def rag_query_pipeline(query, top_k=TOP_K, show_chunks=False):
@@ -81,14 +110,8 @@ def rag_query_pipeline(query, top_k=TOP_K, show_chunks=False):
             print(f"📝 Text:\n{chunk['text']}\n")
             print("-" * 80 + "\n")
     
-    # Step 3: Generate answer using Llama 3
+    # Step 3: Generate answer using Llama 3 (streamed to the console as it is decoded)
     answer = generate_answer(query, retrieved_chunks)
-    
-    # Display answer
-    print("="*80)
-    print("💡 GENERATED ANSWER")
-    print("="*80)
-    print(answer)
     print("\n" + "="*80)
     
     return {
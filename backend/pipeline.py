@@ -0,0 +1,88 @@
+import argparse
+import os
+import sys
+
+import orjson
+
+# Add parent directory to path to import the numbered stage modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+extractor = __import__("1_pdf_extractor")
+normalisation = __import__("2_normalisation")
+chunking = __import__("3_chunking")
+embedding = __import__("4_embedding")
+
+# ---------------- CONFIG ----------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PDF_FILE = os.path.join(BASE_DIR, "Raw Data", "BS-DS_ Jan 2026 Grading document (STUDENT).pdf")
+CLEANED_DIR = os.path.join(BASE_DIR, "Cleaned Data")
+# --------------------------------------
+
+
+def dump_intermediate(raw_text, normalized_text, chunks):
+    """
+    Write the intermediate outputs of each stage, matching the standalone scripts.
+    """
+    with open(os.path.join(CLEANED_DIR, "extracted_text.txt"), "w", encoding="utf-8") as f:
+        f.write(raw_text)
+    with open(os.path.join(CLEANED_DIR, "single_corpus.txt"), "w", encoding="utf-8") as f:
+        f.write(normalized_text)
+    with open(os.path.join(CLEANED_DIR, "chunks.json"), "wb") as f:
+        f.write(orjson.dumps(chunks, option=orjson.OPT_INDENT_2))
+
+    print(f"[INFO] Intermediate outputs written to: {CLEANED_DIR}")
+
+
+def run_pipeline(pdf_path, dump=False):
+    """
+    Run extraction, normalisation, chunking and embedding in one process.
+    Text and chunks are handed between stages in memory instead of
+    round-tripping through the Cleaned Data files.
+
+    Returns:
+        int: Number of chunks stored
+    """
+    # Step 1: Extract text from the PDF
+    print(f"[INFO] Extracting text from: {pdf_path}")
+    raw_text = extractor.extract_text_pymupdf(pdf_path)
+
+    # Step 2: Normalise into a single corpus
+    normalized_text = normalisation.normalize_single_corpus(raw_text)
+    print(f"[INFO] Normalised corpus: {len(normalized_text)} characters")
+
+    # Step 3: Chunk the corpus
+    chunks = chunking.chunk_text(normalized_text)
+
+    if dump:
+        dump_intermediate(raw_text, normalized_text, chunks)
+
+    # Step 4: Embed and store the chunks
+    _, collection = embedding.initialize_chromadb(embedding.CHROMA_DB_PATH, embedding.COLLECTION_NAME)
+    stored = embedding.embed_and_store(chunks, collection)
+
+    # Step 5: Verify storage
+    embedding.verify_storage(collection)
+
+    return stored
+
+
+# ---------------- RUN ----------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the full BS RAG ingestion pipeline in memory.")
+    parser.add_argument("--pdf", default=PDF_FILE, help="Path to the source PDF")
+    parser.add_argument(
+        "--dump-intermediate",
+        action="store_true",
+        help="Also write extracted_text.txt, single_corpus.txt and chunks.json for debugging"
+    )
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print("           BS RAG - FUSED INGESTION PIPELINE")
+    print("="*70 + "\n")
+
+    stored = run_pipeline(args.pdf, dump=args.dump_intermediate)
+
+    print("\n" + "="*70)
+    print(f"           PIPELINE COMPLETE: {stored} CHUNKS STORED")
+    print("="*70 + "\n")